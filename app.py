@@ -1,12 +1,27 @@
 # app.py - Modular Flask Application for Market Data Streaming
+# Eventlet must patch the stdlib before anything else imports it
+if __name__ == '__main__':
+    import eventlet
+    eventlet.monkey_patch()
+
 import os
 import logging
 from datetime import timedelta
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
-from flask_socketio import SocketIO
+from typing import Dict, Tuple
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, session, g
+from flask.json.provider import DefaultJSONProvider
+from flask_socketio import SocketIO, emit, join_room
+from socketio import RedisManager
+from flask_session.sessions import RedisSessionInterface
 from dotenv import load_dotenv
-from auth import get_schwab_client, get_schwab_streamer, require_auth
+import redis
+import orjson
+from auth import require_auth, get_schwab_client, get_schwab_streamer
 from features.feature_manager import FeatureManager
+from streaming.broadcast_batcher import BroadcastBatcher
+from features.market_data import MARKET_DATA_ROOM
+from features.watchlist_sync import WatchlistSync
+from features.market_snapshot import MarketDataSnapshot
 
 # Load environment variables
 load_dotenv()
@@ -15,15 +30,40 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+_TRUES = {'1', 'true', 'yes', 'on'}
+
+def _bool(key: str, default: str) -> bool:
+    """Parse a boolean environment variable once at import"""
+    return os.environ.get(key, default).lower() in _TRUES
+
 # Configuration
 class Config:
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')
-    DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+    DEBUG = _bool('FLASK_DEBUG', 'True')
     HOST = '0.0.0.0'
-    PORT = 8000
+    PORT = int(os.getenv('PORT', '8000'))
+    
+    # Server-side sessions (cookie only carries the signed session id)
+    SESSION_TYPE = 'redis'
+    SESSION_USE_SIGNER = True
+    # Only write the session (SETEX + Set-Cookie) when it changes, not on every request;
+    # sessions then expire 24h after their last change instead of on every visit
+    SESSION_REFRESH_EACH_REQUEST = False
+    REDIS_SOCKET_PATH = os.getenv('REDIS_SOCKET_PATH', '/var/run/redis/redis.sock')
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '32'))
+    
+    # Optional Socket.IO message queue for multi-worker fan-out (e.g. redis://localhost:6379/0).
+    # When set it also replaces REDIS_SOCKET_PATH as the address of the shared Redis pool.
+    REDIS_URL = os.getenv('REDIS_URL')
+    
+    # Process role: 'all' serves clients and streams, 'web' only serves clients,
+    # 'streamer' owns the Schwab connection and publishes ticks through REDIS_URL
+    ROLES = ('all', 'web', 'streamer')
+    ROLE = os.getenv('ROLE', 'all')
     
     # Feature toggles
-    ENABLE_MARKET_DATA = os.getenv('ENABLE_MARKET_DATA', 'true').lower() == 'true'
+    ENABLE_MARKET_DATA = _bool('ENABLE_MARKET_DATA', 'true')
+    USE_MOCK_DATA = _bool('USE_MOCK_DATA', 'false')
     
     # Directories
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,52 +71,271 @@ class Config:
     TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
     STATIC_DIR = os.path.join(BASE_DIR, 'static')
 
+# argparse only checks --role, so reject a bad ROLE env here rather than run it as 'all'
+if Config.ROLE not in Config.ROLES:
+    raise ValueError(f"Invalid ROLE '{Config.ROLE}' - expected one of {', '.join(Config.ROLES)}")
+
+class ORJSON:
+    """orjson-backed json module for Socket.IO packet encoding"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; jsonify in every blueprint picks it up"""
+    
+    # Datetimes go through Flask's default handler so they keep the HTTP date format
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+    
+    def dumps(self, obj, **kwargs) -> str:
+        option = self.OPTIONS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        # Hooks such as the session serializer's object_hook need the stdlib decoder
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs) -> Response:
+        """Build the response from orjson bytes directly, skipping the str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.OPTIONS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option),
+                                        mimetype=self.mimetype)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config.from_object(Config)
-app.permanent_session_lifetime = timedelta(hours=24)
-socketio = SocketIO(app, cors_allowed_origins="*")
+app.url_map.strict_slashes = False  # Must be set before routes are added to apply to them
+app.permanent_session_lifetime = timedelta(hours=24)  # Also used as the Redis session TTL
+
+def _create_redis_pool() -> redis.ConnectionPool:
+    """One pool per process for every Redis user; connections open lazily on first use"""
+    # Blocking so green threads wait for a free connection instead of erroring when it is exhausted
+    if Config.REDIS_URL:
+        return redis.BlockingConnectionPool.from_url(Config.REDIS_URL,
+                                                     max_connections=Config.REDIS_MAX_CONNECTIONS)
+    return redis.BlockingConnectionPool(connection_class=redis.UnixDomainSocketConnection,
+                                        path=Config.REDIS_SOCKET_PATH,
+                                        max_connections=Config.REDIS_MAX_CONNECTIONS)
+
+REDIS_POOL = _create_redis_pool()
+
+def get_redis() -> redis.Redis:
+    """Redis client backed by the shared process-wide pool"""
+    return redis.Redis(connection_pool=REDIS_POOL)
+
+class PooledRedisManager(RedisManager):
+    """Socket.IO message queue that draws its connections from the shared Redis pool"""
+    
+    def _redis_connect(self):
+        self.redis = get_redis()
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+
+class RefreshAwareRedisSessionInterface(RedisSessionInterface):
+    """Flask-Session 0.5 ignores should_set_cookie; skip the save when it says no"""
+    
+    def save_session(self, app, session, response):
+        if session and not self.should_set_cookie(app, session):
+            return
+        super().save_session(app, session, response)
+
+def _init_session_store():
+    """Use Redis for sessions, falling back to signed cookies if Redis is unreachable"""
+    try:
+        session_redis = get_redis()
+        session_redis.ping()
+    except Exception as e:
+        logger.warning("Redis unavailable (%s) - using cookie sessions", e)
+        return
+    
+    app.session_interface = RefreshAwareRedisSessionInterface(
+        session_redis, 'session:', Config.SESSION_USE_SIGNER, permanent=True)
+    logger.info("✅ Redis session store enabled")
+
+_init_session_store()
+
+# Same channel Flask-SocketIO uses for message_queue, so external emitters keep working
+socketio = SocketIO(app, 
+                    cors_allowed_origins="*", 
+                    json=ORJSON, 
+                    async_mode='eventlet', 
+                    http_compression=False,  # Batches are pre-compressed once, not per client
+                    client_manager=PooledRedisManager(Config.REDIS_URL, channel='flask-socketio') if Config.REDIS_URL else None)
+
+class _NoWebSocketDeflate:
+    """
+    WSGI middleware that hides the client's Sec-WebSocket-Extensions header on
+    Socket.IO requests, so eventlet never negotiates permessage-deflate and does not
+    re-deflate the pre-compressed batches separately for every client.
+    """
+    
+    def __init__(self, wsgi_app, path: str = '/socket.io'):
+        self.wsgi_app = wsgi_app
+        self.path = path
+    
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(self.path):
+            environ.pop('HTTP_SEC_WEBSOCKET_EXTENSIONS', None)
+        return self.wsgi_app(environ, start_response)
+
+# Wraps the Socket.IO middleware installed above, so the header is gone before the upgrade
+app.wsgi_app = _NoWebSocketDeflate(app.wsgi_app)
+
+# Coalesce market data ticks into one Socket.IO message per flush window
+batcher = BroadcastBatcher(socketio)
 
 # Initialize feature manager
-feature_manager = FeatureManager(Config.DATA_DIR, socketio)
+feature_manager = FeatureManager(Config.DATA_DIR, socketio, batcher)
 app.feature_manager = feature_manager  # Make accessible via current_app
 
-# Create required directories
-os.makedirs(Config.DATA_DIR, exist_ok=True)
-os.makedirs(Config.TEMPLATES_DIR, exist_ok=True)
-os.makedirs(os.path.join(Config.STATIC_DIR, 'css'), exist_ok=True)
-os.makedirs(os.path.join(Config.STATIC_DIR, 'js'), exist_ok=True)
+# Carries watchlist edits from web workers to the streamer in split roles
+watchlist_sync = WatchlistSync(get_redis(), socketio)
 
-def _initialize_features(use_mock: bool = False):
-    """Initialize features based on configuration"""
-    if Config.ENABLE_MARKET_DATA:
-        try:
-            if use_mock:
-                # Use mock components directly for mock mode
-                from mock_data import MockSchwabClient, MockSchwabStreamer
-                schwab_client = MockSchwabClient()
-                schwab_streamer = MockSchwabStreamer()
-            else:
-                # Use real Schwab components for real mode
-                schwab_client = get_schwab_client()
-                schwab_streamer = get_schwab_streamer()
-            
-            market_data_manager = feature_manager.initialize_market_data(
-                schwab_client, schwab_streamer, use_mock
-            )
-            
-            if market_data_manager:
-                logger.info(f"✅ Market data initialized ({'mock' if use_mock else 'real'} mode)")
-                logger.info(f"📋 Manager watchlist: {market_data_manager.get_watchlist()}")
-                logger.info(f"🎭 Manager mock mode: {market_data_manager.is_mock_mode}")
-            else:
-                logger.error("❌ Failed to initialize market data")
+# Streamer's latest quotes and replay frame, for web workers that never see ticks
+market_snapshot = MarketDataSnapshot(get_redis(), socketio, batcher, 'market_data_batch', MARKET_DATA_ROOM)
+
+# Create required directories (DATA_DIR is created last, so warm restarts skip the whole pass)
+if not os.path.isdir(Config.DATA_DIR):
+    required_dirs = {
+        os.path.join(Config.STATIC_DIR, 'css'),
+        os.path.join(Config.STATIC_DIR, 'js'),
+        Config.TEMPLATES_DIR,
+    }
+    for directory in sorted(required_dirs, key=len):
+        os.makedirs(directory, exist_ok=True)
+    os.makedirs(Config.DATA_DIR, exist_ok=True)
+
+# Rendered pages keyed by the state they depend on
+_PAGE_CACHE: Dict[Tuple, str] = {}
+
+def _render_cached(key: Tuple, template: str, **context) -> str:
+    """Render a template once per key; pages with pending flash messages are never cached"""
+    if '_flashes' in session:
+        return render_template(template, **context)
+    
+    html = _PAGE_CACHE.get(key)
+    if html is None:
+        html = _PAGE_CACHE[key] = render_template(template, **context)
+    return html
+
+def _mock_factories():
+    """Mock client/streamer constructors"""
+    from mock_data import MockSchwabClient, MockSchwabStreamer
+    return MockSchwabClient, MockSchwabStreamer
+
+def _real_factories():
+    """Real Schwab client/streamer factories"""
+    return get_schwab_client, get_schwab_streamer
+
+def _make_initializer(use_mock: bool, resolve_factories):
+    """Build a feature initializer specialized for one data mode"""
+    mode_label = 'mock' if use_mock else 'real'
+    factories = None
+    
+    def initialize():
+        """Initialize features based on configuration"""
+        nonlocal factories
+        _PAGE_CACHE.clear()
+        if Config.ROLE == 'web':
+            # Built by start_role_services; ticks come from the streamer
+            logger.info("Web role - market data is streamed by the streamer worker")
+            return
+        
+        if Config.ENABLE_MARKET_DATA:
+            try:
+                # Resolve the client/streamer factories on first use only
+                if factories is None:
+                    factories = resolve_factories()
+                client_factory, streamer_factory = factories
                 
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize market data: {e}")
+                market_data_manager = feature_manager.initialize_market_data(
+                    client_factory(), streamer_factory(), use_mock
+                )
+                
+                if market_data_manager:
+                    _start_market_data_streaming(market_data_manager)
+                    logger.info("✅ Market data initialized (%s mode)", mode_label)
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("📋 Manager watchlist: %s", market_data_manager.get_watchlist())
+                        logger.info("🎭 Manager mock mode: %s", market_data_manager.is_mock_mode)
+                else:
+                    logger.error("❌ Failed to initialize market data")
+                    
+            except Exception as e:
+                logger.error("❌ Failed to initialize market data: %s", e)
+    
+    return initialize
+
+_init_mock = _make_initializer(True, _mock_factories)
+_init_real = _make_initializer(False, _real_factories)
+
+def _get_init(use_mock: bool):
+    """Return the feature initializer for the given data mode"""
+    return _init_mock if use_mock else _init_real
+
+def _start_market_data_streaming(market_data_manager):
+    """Start upstream streaming once; repeat authentications reuse the running stream"""
+    # Double-checked so concurrent authentications start the upstream stream only once
+    if market_data_manager._streaming_started:
+        return
+    with feature_manager._market_lock:
+        if not market_data_manager._streaming_started:
+            if market_data_manager.start_streaming():
+                market_data_manager._streaming_started = True
+                logger.info("Started market data streaming")
+            else:
+                logger.error("Failed to start market data streaming")
+
+def start_role_services():
+    """
+    Per-process startup for the split roles, run once the eventlet hub is up
+    (gunicorn's post_worker_init, or the __main__ entry point).
+    The streamer opens the upstream connection and applies published watchlist edits;
+    web workers build a market data manager that never streams, so the REST API can
+    serve reads, and relay edits to the streamer.
+    """
+    if Config.ROLE != 'all' and not Config.REDIS_URL:
+        logger.warning("Role '%s' without REDIS_URL - ticks will not reach other workers", Config.ROLE)
+    
+    if Config.ROLE == 'all' or not Config.ENABLE_MARKET_DATA:
+        return
+    
+    if Config.ROLE == 'streamer':
+        _get_init(use_mock=Config.USE_MOCK_DATA)()
+        market_data_manager = feature_manager.get_feature('market_data')
+        if market_data_manager:
+            watchlist_sync.start(market_data_manager.apply_watchlist_change)
+            market_snapshot.start(market_data_manager)
+            # Web workers subscribed before watchlist.json was written still see the startup symbols
+            for symbol in market_data_manager.get_watchlist():
+                watchlist_sync.publish('add', symbol)
+    else:
+        market_data_manager = feature_manager.initialize_market_data(None, None, Config.USE_MOCK_DATA)
+        if market_data_manager:
+            market_data_manager.watchlist_sync = watchlist_sync
+            market_data_manager.snapshot = market_snapshot
+            # Reload on (re)subscribe to pick up edits the streamer saved while we weren't listening
+            watchlist_sync.start(market_data_manager.apply_watchlist_change,
+                                 on_subscribe=market_data_manager.load_watchlist)
 
 def _cleanup_features():
     """Clean up features during logout"""
+    _PAGE_CACHE.clear()
+    batcher.clear()  # Reconnecting clients must not be replayed the old session's ticks
     if feature_manager.is_feature_enabled('market_data'):
         try:
             market_data_manager = feature_manager.get_feature('market_data')
@@ -84,22 +343,42 @@ def _cleanup_features():
                 market_data_manager.stop_streaming()
                 logger.info("Stopped market data streaming")
         except Exception as e:
-            logger.error(f"Error stopping streaming during cleanup: {e}")
+            logger.error("Error stopping streaming during cleanup: %s", e)
+
+@app.before_request
+def _load_auth():
+    """Read auth state from the session once per request"""
+    g.authenticated = session.get('authenticated', False)
+    g.mock_mode = session.get('mock_mode', False)
 
 # Authentication routes
 @app.route('/login')
 def login():
-    return render_template('login.html')
+    return _render_cached(('login.html',), 'login.html')
 
 @app.route('/authenticate')
 def authenticate():
     """Enhanced authentication with mock mode tracking"""
     try:
-        # Determine if using mock mode - check this FIRST before any auth
-        use_mock = (
-            request.args.get('mock', 'false').lower() == 'true' or
-            os.getenv('USE_MOCK_DATA', 'false').lower() == 'true'
-        )
+        if Config.ROLE == 'web':
+            # The streamer owns the Schwab connection, so don't build a client in every worker;
+            # the session shows the streamer's data mode (USE_MOCK_DATA), not the login choice
+            session['authenticated'] = True
+            session['mock_mode'] = Config.USE_MOCK_DATA
+            session.permanent = True
+            
+            logger.info("Web role - using the streamer's %s data", 'MOCK' if Config.USE_MOCK_DATA else 'REAL')
+            if Config.USE_MOCK_DATA:
+                flash('🎭 Using MOCK data mode - Data is simulated for testing', 'warning')
+            else:
+                flash('✅ Using REAL market data from the Schwab API', 'success')
+            
+            _get_init(use_mock=Config.USE_MOCK_DATA)()
+            return redirect(url_for('index'))
+        
+        # Determine if using mock mode - check this FIRST before any auth.
+        # The streamer role streams in USE_MOCK_DATA mode whatever the login page asked for.
+        use_mock = Config.USE_MOCK_DATA or (Config.ROLE == 'all' and (request.args.get('mock') or '').lower() in _TRUES)
         
         if use_mock:
             # Skip all Schwab auth and go straight to mock mode
@@ -111,7 +390,7 @@ def authenticate():
             flash('🎭 Using MOCK data mode - Data is simulated for testing', 'warning')
             
             # Initialize features with mock mode
-            _initialize_features(use_mock=True)
+            _get_init(use_mock=True)()
         else:
             # Try real Schwab authentication
             schwab_client = get_schwab_client()
@@ -125,7 +404,7 @@ def authenticate():
                 flash('✅ Connected to Schwab API - Using REAL market data', 'success')
                 
                 # Initialize features with real mode
-                _initialize_features(use_mock=False)
+                _get_init(use_mock=False)()
             else:
                 # Fallback to mock mode
                 session['authenticated'] = True
@@ -133,17 +412,17 @@ def authenticate():
                 session.permanent = True
                 logger.info("Fallback to mock mode - no client available")
                 flash('⚠️ Could not connect to Schwab API. Using MOCK data mode.', 'error')
-                _initialize_features(use_mock=True)
+                _get_init(use_mock=True)()
         
         return redirect(url_for('index'))
         
     except Exception as e:
-        logger.error(f"Authentication error: {e}")
+        logger.error("Authentication error: %s", e)
         session['authenticated'] = True
         session['mock_mode'] = True
         logger.info("Error fallback to mock mode")
         flash(f'Authentication error: {e}. Using MOCK data mode.', 'error')
-        _initialize_features(use_mock=True)
+        _get_init(use_mock=True)()
         return redirect(url_for('index'))
 
 @app.route('/logout')
@@ -164,7 +443,9 @@ def index():
         'market_data_initialized': feature_manager.is_feature_enabled('market_data')
     }
     
-    return render_template('index.html', features=features)
+    # The mock mode banner is rendered from the session, so it is part of the key
+    cache_key = ('index.html', features['market_data'], features['market_data_initialized'], g.mock_mode)
+    return _render_cached(cache_key, 'index.html', features=features)
 
 # Register blueprints conditionally
 if Config.ENABLE_MARKET_DATA:
@@ -175,24 +456,26 @@ if Config.ENABLE_MARKET_DATA:
 else:
     logger.info("Market data feature disabled")
 
+# Compile the URL map now so the first request doesn't pay for it
+app.url_map.update()
+
 # SocketIO event handlers
 @socketio.on('connect')
 def handle_connect():
     logger.info('Client connected')
+    authenticated = session.get('authenticated', False)
     
-    # Start streaming if market data is enabled and user is authenticated
-    if session.get('authenticated') and feature_manager.is_feature_enabled('market_data'):
-        try:
-            market_data_manager = feature_manager.get_feature('market_data')
-            if market_data_manager and not hasattr(market_data_manager, '_streaming_started'):
-                success = market_data_manager.start_streaming()
-                if success:
-                    market_data_manager._streaming_started = True
-                    logger.info("Started market data streaming for new client")
-                else:
-                    logger.error("Failed to start market data streaming")
-        except Exception as e:
-            logger.error(f"Error starting streaming on connect: {e}")
+    # Streaming is already running (started at authentication) - just join the broadcast room
+    if authenticated:
+        join_room(MARKET_DATA_ROOM)
+        
+        # Replay the latest batch so reconnecting clients don't wait for the next tick
+        if Config.ROLE == 'web':
+            last_frame = market_snapshot.last_frame()
+        else:
+            last_frame = batcher.last_frame('market_data_batch', MARKET_DATA_ROOM)
+        if last_frame:
+            emit('market_data_batch', last_frame)
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -201,13 +484,24 @@ def handle_disconnect():
 # Features will be initialized when user authenticates
 logger.info("🚀 Application started - features will be initialized on authentication")
 
+# Development / streamer entry point - production web workers run under gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
-    logger.info(f"Starting Flask-SocketIO server on {Config.HOST}:{Config.PORT}")
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Market data streaming server')
+    parser.add_argument('--role', choices=Config.ROLES, default=Config.ROLE,
+                        help="'web' workers only serve clients; one 'streamer' owns the Schwab connection")
+    Config.ROLE = parser.parse_args().role
+    
+    # The streamer owns the upstream connection from startup instead of waiting for a login;
+    # a web process builds its read-only market data manager
+    start_role_services()
+    
+    logger.info(f"Starting Flask-SocketIO server on {Config.HOST}:{Config.PORT} (role: {Config.ROLE})")
     logger.info(f"Debug mode: {Config.DEBUG}")
     logger.info(f"Features enabled: Market Data={Config.ENABLE_MARKET_DATA}")
     
-    socketio.run(app, 
-                host=Config.HOST, 
-                port=Config.PORT, 
-                debug=Config.DEBUG,
-                allow_unsafe_werkzeug=True)
\ No newline at end of file
+    from eventlet import wsgi
+    
+    # SocketIO wraps app.wsgi_app, so serving app directly handles WebSocket traffic too
+    wsgi.server(eventlet.listen((Config.HOST, Config.PORT)), app, debug=Config.DEBUG)
\ No newline at end of file
@@ -1,9 +1,11 @@
 # auth.py - Simple authentication using schwabdev library
 import os
 import dotenv
-import schwabdev
 from functools import wraps
-from flask import session, redirect, url_for, jsonify, request
+from flask import Response, g, jsonify, request
+
+# Login page for unauthenticated HTML requests; a fixed path skips the url_for lookup
+LOGIN_PATH = '/login'
 
 def get_schwab_client():
     """
@@ -12,6 +14,9 @@ def get_schwab_client():
         schwabdev.Client: The Schwab client instance or None if failed.
     """
     try:
+        # Imported here so the SDK only loads when real authentication runs
+        import schwabdev
+        
         # Load environment variables
         dotenv.load_dotenv()
         app_key = os.getenv("SCHWAB_APP_KEY")
@@ -49,21 +54,20 @@ def require_auth(f):
     Decorator to require authentication for routes.
     Redirects unauthenticated users to login page for HTML requests.
     Returns 401 JSON error for API requests.
+    Reads the auth flag cached on g by the app before_request hook.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        authenticated = session.get('authenticated')
-        print(f"🔍 require_auth check: path={request.path}, authenticated={authenticated}, session_keys={list(session.keys())}")
+        if g.get('authenticated', False):
+            return f(*args, **kwargs)
+        
+        # Check if this is an API request (JSON content type or /api/ path)
+        if (request.is_json or 
+            request.path.startswith('/api/') or 
+            request.headers.get('Content-Type') == 'application/json'):
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        if not authenticated:
-            # Check if this is an API request (JSON content type or /api/ path)
-            if (request.is_json or 
-                request.path.startswith('/api/') or 
-                request.headers.get('Content-Type') == 'application/json'):
-                return jsonify({'error': 'Not authenticated'}), 401
-            else:
-                # HTML request - redirect to login
-                print(f"🔄 Redirecting to login from {request.path}")
-                return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+        # HTML request - redirect to login. Built per request rather than shared,
+        # since the session interface may add Set-Cookie to the response.
+        return Response(status=302, headers={'Location': LOGIN_PATH})
+    return decorated_function
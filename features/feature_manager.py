@@ -1,6 +1,7 @@
 # core/feature_manager.py - Centralized feature initialization
 import os
 import logging
+import threading
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -8,11 +9,13 @@ logger = logging.getLogger(__name__)
 class FeatureManager:
     """Manages feature initialization and configuration"""
     
-    def __init__(self, data_dir: str, socketio):
+    def __init__(self, data_dir: str, socketio, batcher=None):
         self.data_dir = data_dir
         self.socketio = socketio
+        self.batcher = batcher
         self.features: Dict[str, Any] = {}
         self.is_mock_mode = False
+        self._market_lock = threading.Lock()  # Serializes market data streaming start
         
     def initialize_market_data(self, schwab_client, schwab_streamer, is_mock_mode: bool = False):
         """Initialize market data feature"""
@@ -21,7 +24,7 @@ class FeatureManager:
             
             self.is_mock_mode = is_mock_mode
             manager = get_market_data_manager(self.data_dir)
-            manager.set_dependencies(schwab_client, schwab_streamer, self.socketio, is_mock_mode)
+            manager.set_dependencies(schwab_client, schwab_streamer, self.socketio, is_mock_mode, self.batcher)
             
             self.features['market_data'] = manager
             logger.info(f"Market data feature initialized (mock_mode: {is_mock_mode})")
@@ -7,17 +7,26 @@ import sqlite3
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Set, Optional, Callable
 import threading
+import msgspec
 from streaming.equity_stream_manager import EquityStreamManager
+from streaming.equity_stream import EquityTick
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Socket.IO room that authenticated dashboard clients join for tick broadcasts
+MARKET_DATA_ROOM = 'market_data'
+
 class MarketDataManager:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
-        self.market_data: Dict[str, Any] = {}
+        self.market_data: Dict[str, EquityTick] = {}
         self.watchlist: Set[str] = set()
         self.is_mock_mode = False
+        self._streaming_started = False
+        self.watchlist_sync = None  # Set on web-role managers; edits are relayed to the streamer
+        self.batcher = None
+        self.snapshot = None  # Set on web-role managers; quotes come from the streamer's snapshot
         
         # Initialize equity streaming manager
         self.equity_stream_manager = EquityStreamManager()
@@ -32,10 +41,11 @@ class MarketDataManager:
         # Load watchlist on initialization
         self.load_watchlist()
     
-    def set_dependencies(self, schwab_client, schwab_streamer, socketio, is_mock_mode: bool = False):
+    def set_dependencies(self, schwab_client, schwab_streamer, socketio, is_mock_mode: bool = False, batcher=None):
         """Inject external dependencies"""
         self.schwab_client = schwab_client
         self.socketio = socketio
+        self.batcher = batcher
         self.is_mock_mode = is_mock_mode
         
         # Configure equity stream manager
@@ -50,10 +60,10 @@ class MarketDataManager:
         
         if is_mock_mode:
             db_filename = os.path.join(self.data_dir, f'MOCK_market_data_{today_date}.db')
-            logger.info(f"Using MOCK database: {db_filename}")
+            logger.info("Using MOCK database: %s", db_filename)
         else:
             db_filename = os.path.join(self.data_dir, f'market_data_{today_date}.db')
-            logger.info(f"Using REAL database: {db_filename}")
+            logger.info("Using REAL database: %s", db_filename)
         
         conn = sqlite3.connect(db_filename)
         cursor = conn.cursor()
@@ -140,6 +150,13 @@ class MarketDataManager:
         if symbol in self.watchlist:
             return False
         
+        self._drop_replay_frames()
+        if self.watchlist_sync:
+            # Web role: the streamer owns subscriptions and watchlist.json
+            self.watchlist_sync.publish('add', symbol)
+            self.apply_watchlist_change('add', symbol)
+            return self.equity_stream_manager.validate_symbol(symbol)
+        
         self.watchlist.add(symbol)
         self.save_watchlist()
         
@@ -153,6 +170,13 @@ class MarketDataManager:
         if symbol not in self.watchlist:
             return False
         
+        self._drop_replay_frames()
+        if self.watchlist_sync:
+            # Web role: the streamer owns subscriptions and watchlist.json
+            self.watchlist_sync.publish('remove', symbol)
+            self.apply_watchlist_change('remove', symbol)
+            return True
+        
         self.watchlist.remove(symbol)
         self.save_watchlist()
         
@@ -165,6 +189,26 @@ class MarketDataManager:
         
         return True
     
+    def apply_watchlist_change(self, action: str, symbol: str):
+        """Apply a watchlist edit published by another process"""
+        if self.watchlist_sync:
+            # Web role: mirror the edit so this worker's reads match the streamer
+            self._drop_replay_frames()
+            if action == 'add':
+                self.watchlist.add(symbol)
+            else:
+                self.watchlist.discard(symbol)
+                self.market_data.pop(symbol, None)
+        elif action == 'add':
+            self.add_symbol(symbol)
+        else:
+            self.remove_symbol(symbol)
+    
+    def _drop_replay_frames(self):
+        """The cached replay batch may list removed symbols once the watchlist changes"""
+        if self.batcher:
+            self.batcher.drop_frames(MARKET_DATA_ROOM)
+    
     def get_watchlist(self) -> list:
         """Get current watchlist as a list"""
         return list(self.watchlist)
@@ -172,16 +216,17 @@ class MarketDataManager:
     def get_market_data(self) -> Dict[str, Any]:
         """Get current market data with metadata"""
         return {
-            'market_data': self.market_data,
+            'market_data': self.snapshot.load() if self.snapshot else msgspec.to_builtins(self.market_data),
             'is_mock_mode': self.is_mock_mode,
             'data_source': 'MOCK' if self.is_mock_mode else 'SCHWAB_API',
             'timestamp': int(time.time() * 1000)
         }
     
-    def _process_equity_data_callback(self, equity_data: Dict[str, Any]):
+    def _process_equity_data_callback(self, equity_data: EquityTick):
         """Callback for processed equity data from EquityStreamManager"""
-        symbol = equity_data.get('symbol')
-        if not symbol:
+        symbol = equity_data.symbol
+        if not symbol or symbol not in self.watchlist:
+            # Late quotes for a symbol just removed must not re-add it
             return
             
         # Store globally
@@ -190,19 +235,22 @@ class MarketDataManager:
         # Save to database
         self._save_to_database(equity_data)
         
-        # Emit to clients
-        if self.socketio:
-            self.socketio.emit('market_data', {
-                'symbol': symbol, 
-                'data': equity_data,
-                'is_mock': self.is_mock_mode
-            })
+        # Emit to clients (batched when a batcher is configured)
+        packet = {
+            'symbol': symbol, 
+            'data': equity_data,
+            'is_mock': self.is_mock_mode
+        }
+        if self.batcher:
+            self.batcher.enqueue('market_data_batch', packet, room=MARKET_DATA_ROOM)
+        elif self.socketio:
+            self.socketio.emit('market_data', msgspec.to_builtins(packet), room=MARKET_DATA_ROOM)
         
-        # Enhanced logging
-        source_label = "MOCK" if self.is_mock_mode else "REAL"
-        logger.info(f"{source_label} data for {symbol}: Last ${equity_data.get('last_price', 'N/A')}")
+        # Enhanced logging (per tick, so formatting is deferred until the record is emitted)
+        logger.info("%s data for %s: Last $%s", "MOCK" if self.is_mock_mode else "REAL",
+                    symbol, equity_data.last_price)
 
-    def _save_to_database(self, market_data_item: Dict[str, Any]):
+    def _save_to_database(self, market_data_item: EquityTick):
         """Save market data to database"""
         try:
             conn = self.get_db_connection()
@@ -213,12 +261,12 @@ class MarketDataManager:
                  net_change, net_change_percent, high_price, low_price, data_source)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
-                market_data_item['symbol'], market_data_item['timestamp'], 
-                market_data_item['last_price'], market_data_item['bid_price'],
-                market_data_item['ask_price'], market_data_item['volume'], 
-                market_data_item['net_change'], market_data_item['net_change_percent'], 
-                market_data_item['high_price'], market_data_item['low_price'], 
-                market_data_item['data_source']
+                market_data_item.symbol, market_data_item.timestamp, 
+                market_data_item.last_price, market_data_item.bid_price,
+                market_data_item.ask_price, market_data_item.volume, 
+                market_data_item.net_change, market_data_item.net_change_percent, 
+                market_data_item.high_price, market_data_item.low_price, 
+                market_data_item.data_source
             ))
             conn.commit()
             conn.close()
@@ -258,6 +306,7 @@ class MarketDataManager:
     def stop_streaming(self):
         """Stop market data streaming"""
         self.equity_stream_manager.stop_streaming()
+        self._streaming_started = False
         logger.info("Market data streaming stopped")
     
     def get_auth_status(self) -> Dict[str, Any]:
@@ -1,5 +1,5 @@
 # market_data_routes.py - Modular Market Data Routes
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, current_app
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, current_app, g
 from flask_socketio import emit
 import logging
 from auth import require_auth
@@ -92,8 +92,8 @@ def get_market_data():
 @market_data_bp.route('/api/auth-status')
 def auth_status():
     """Get authentication and system status"""
-    is_authenticated = session.get('authenticated', False)
-    mock_mode = session.get('mock_mode', False)
+    is_authenticated = g.get('authenticated', False)
+    mock_mode = g.get('mock_mode', False)
     
     if not is_authenticated:
         return jsonify({'authenticated': False})
@@ -193,7 +193,7 @@ def register_socketio_handlers(socketio):
         # Send current market data
         manager = _get_manager()
         if manager:
-            for symbol, data in manager.market_data.items():
+            for symbol, data in manager.get_market_data()['market_data'].items():
                 emit('market_data', {'symbol': symbol, 'data': data})
 
     @socketio.on('disconnect')
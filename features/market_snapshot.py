@@ -0,0 +1,94 @@
+# market_snapshot.py - Share the streamer's latest quotes with web workers
+import logging
+from typing import Any, Dict, Optional
+import msgspec
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Redis keys written by the streamer and read by web workers
+SNAPSHOT_KEY = 'market_data:snapshot'      # Hash: symbol -> latest tick JSON
+LAST_FRAME_KEY = 'market_data:last_frame'  # Latest compressed broadcast batch
+
+class MarketDataSnapshot:
+    """
+    The streamer copies its latest quote per symbol and its last broadcast
+    frame to Redis once per interval, so web workers, which never see ticks
+    themselves, can serve /api/market-data and replay a frame on connect.
+    """
+
+    INTERVAL = 0.5  # Seconds between snapshot writes; only changed symbols are written
+
+    def __init__(self, redis_client, socketio, batcher, event: str, room: Optional[str] = None):
+        self.redis = redis_client
+        self.socketio = socketio
+        self.batcher = batcher
+        self.event = event
+        self.room = room
+        self._encoder = msgspec.json.Encoder()
+        self._written: Dict[str, Any] = {}
+        self._written_frame: Optional[bytes] = None
+        self._started = False
+
+    def start(self, manager):
+        """Streamer side: replace any previous snapshot and keep it current from a background task"""
+        if self._started:
+            return
+        self._started = True
+        try:
+            self.redis.delete(SNAPSHOT_KEY, LAST_FRAME_KEY)
+        except Exception as e:
+            logger.error("Error clearing market data snapshot: %s", e)
+        self.socketio.start_background_task(self._run, manager)
+
+    def load(self) -> Dict[str, Any]:
+        """Web side: latest quote per symbol"""
+        try:
+            return {symbol.decode(): msgspec.json.decode(tick)
+                    for symbol, tick in self.redis.hgetall(SNAPSHOT_KEY).items()}
+        except Exception as e:
+            logger.warning("Market data snapshot unavailable: %s", e)
+            return {}
+
+    def last_frame(self) -> Optional[bytes]:
+        """Web side: latest compressed batch, for replay to connecting clients"""
+        try:
+            return self.redis.get(LAST_FRAME_KEY)
+        except Exception as e:
+            logger.warning("Market data snapshot unavailable: %s", e)
+            return None
+
+    def _run(self, manager):
+        """Background task: write what changed since the last interval"""
+        while True:
+            self.socketio.sleep(self.INTERVAL)
+            try:
+                self._write(manager)
+            except Exception as e:
+                logger.error("Error writing market data snapshot: %s", e)
+
+    def _write(self, manager):
+        """Write changed and removed symbols and a new replay frame in one round trip"""
+        current = dict(manager.market_data)
+        changed = {symbol: self._encoder.encode(tick) for symbol, tick in current.items()
+                   if self._written.get(symbol) is not tick}
+        removed = [symbol for symbol in self._written if symbol not in current]
+        frame = self.batcher.last_frame(self.event, self.room)
+
+        if not changed and not removed and frame is self._written_frame:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        if changed:
+            pipe.hset(SNAPSHOT_KEY, mapping=changed)
+        if removed:
+            pipe.hdel(SNAPSHOT_KEY, *removed)
+        if frame is not self._written_frame:
+            if frame is None:
+                pipe.delete(LAST_FRAME_KEY)
+            else:
+                pipe.set(LAST_FRAME_KEY, frame)
+        pipe.execute()
+
+        self._written = current
+        self._written_frame = frame
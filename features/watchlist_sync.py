@@ -0,0 +1,66 @@
+# watchlist_sync.py - Relay watchlist edits between web workers and the streamer
+import json
+import logging
+from typing import Callable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel carrying watchlist edits
+WATCHLIST_CHANNEL = 'watchlist-sync'
+
+class WatchlistSync:
+    """
+    Publishes watchlist edits made in one process and applies the edits
+    published by the others. Web workers mirror them into their in-memory
+    watchlist; the streamer applies them to its subscriptions and watchlist.json.
+    """
+
+    RETRY_DELAY = 1        # Seconds before resubscribing after a Redis error
+    MAX_RETRY_DELAY = 60   # Backoff ceiling
+
+    def __init__(self, redis_client, socketio):
+        self.redis = redis_client
+        self.socketio = socketio
+        self._started = False
+
+    def publish(self, action: str, symbol: str):
+        """Announce an 'add' or 'remove' of symbol to every process"""
+        self.redis.publish(WATCHLIST_CHANNEL, json.dumps({'action': action, 'symbol': symbol}))
+
+    def start(self, handler: Callable[[str, str], None], on_subscribe: Optional[Callable[[], None]] = None):
+        """
+        Apply incoming edits with handler(action, symbol) from a background task.
+        on_subscribe runs after every (re)subscribe, to catch up on edits missed
+        while not listening.
+        """
+        if self._started:
+            return
+        self._started = True
+        self.socketio.start_background_task(self._listen, handler, on_subscribe)
+
+    def _listen(self, handler: Callable[[str, str], None], on_subscribe: Optional[Callable[[], None]]):
+        """Background task: apply published edits, resubscribing after Redis errors"""
+        delay = self.RETRY_DELAY
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(WATCHLIST_CHANNEL)
+                logger.info("Listening for watchlist edits on '%s'", WATCHLIST_CHANNEL)
+                delay = self.RETRY_DELAY
+                if on_subscribe:
+                    on_subscribe()
+
+                for message in pubsub.listen():
+                    try:
+                        edit = json.loads(message['data'])
+                        handler(edit['action'], edit['symbol'])
+                    except Exception as e:
+                        logger.error("Error applying watchlist edit %r: %s", message.get('data'), e)
+            except Exception as e:
+                logger.error("Watchlist sync error: %s - retrying in %ss", e, delay)
+            finally:
+                pubsub.close()
+
+            self.socketio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RETRY_DELAY)
@@ -0,0 +1,26 @@
+# gunicorn.conf.py - Production server configuration
+# Run with: gunicorn app:app
+#
+# Web workers only serve clients. Run a single streamer alongside them so one
+# process owns the Schwab connection and publishes ticks through REDIS_URL:
+#   ROLE=streamer PORT=8001 python app.py
+import os
+
+bind = '0.0.0.0:8000'
+worker_class = 'eventlet'
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# Build FeatureManager, Redis clients and the Jinja cache once and share them copy-on-write.
+# app.py is imported before the eventlet worker patches threading (patching the master
+# here breaks its signal handling); that is safe because web-role workers never take
+# the streaming start lock.
+preload_app = True
+
+# Workers default to the web role so none of them opens its own upstream streamer;
+# post_worker_init gives each one a non-streaming manager for the REST API
+raw_env = [f"ROLE={os.getenv('ROLE', 'web')}"]
+
+def post_worker_init(worker):
+    """Per-worker role setup; runs after the eventlet worker has patched the stdlib"""
+    from app import start_role_services
+    start_role_services()
@@ -9,9 +9,14 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Callable, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
+import os
 import queue
+import tempfile
+import zlib
 import unittest
 from unittest.mock import Mock, patch, MagicMock
+from streaming.broadcast_batcher import BroadcastBatcher
+from features.market_data import MarketDataManager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -549,6 +554,120 @@ class MarketDataStreamingTests(unittest.TestCase):
         # Should generate 1000 quotes in less than 1 second
         self.assertLess(end_time - start_time, 1.0)
 
+    def _emitted_packets(self, socketio) -> List[list]:
+        """Decode every batch frame emitted on a mock socketio back to its packet list"""
+        return [json.loads(zlib.decompress(c.args[1])) for c in socketio.emit.call_args_list]
+    
+    def test_batcher_single_emit_per_window(self):
+        """Test that ticks queued within one flush window go out as one emit"""
+        socketio = Mock()
+        batcher = BroadcastBatcher(socketio)
+        
+        for i in range(5):
+            batcher.enqueue('market_data_batch', {'symbol': 'AAPL', 'seq': i}, room='market_data')
+        
+        # Nothing is sent until the window closes, and only one flush is scheduled
+        socketio.emit.assert_not_called()
+        self.assertEqual(socketio.start_background_task.call_count, 1)
+        
+        # Run the scheduled flush task
+        task, delay = socketio.start_background_task.call_args.args
+        self.assertEqual(delay, BroadcastBatcher.FLUSH_INTERVAL)
+        task(delay)
+        
+        self.assertEqual(socketio.emit.call_count, 1)
+        self.assertEqual(socketio.emit.call_args.args[0], 'market_data_batch')
+        self.assertEqual(socketio.emit.call_args.kwargs['room'], 'market_data')
+        self.assertEqual([p['seq'] for p in self._emitted_packets(socketio)[0]], list(range(5)))
+    
+    def test_batcher_flushes_early_at_max_pending(self):
+        """Test that a full buffer is emitted without waiting for the window"""
+        socketio = Mock()
+        batcher = BroadcastBatcher(socketio, max_pending=3)
+        
+        for i in range(4):
+            batcher.enqueue('market_data_batch', {'seq': i})
+        
+        # The first three went out immediately; the fourth waits for the window
+        self.assertEqual(socketio.emit.call_count, 1)
+        self.assertEqual([p['seq'] for p in self._emitted_packets(socketio)[0]], [0, 1, 2])
+        
+        batcher.flush()
+        self.assertEqual([p['seq'] for p in self._emitted_packets(socketio)[1]], [3])
+    
+    def test_batcher_frame_round_trip(self):
+        """Test that an emitted frame decompresses back to the queued packets"""
+        socketio = Mock()
+        batcher = BroadcastBatcher(socketio)
+        packets = [
+            {'symbol': 'AAPL', 'data': {'last_price': 150.25, 'volume': 1000}, 'is_mock': True},
+            {'symbol': 'MSFT', 'data': {'last_price': 410.5, 'volume': 2500}, 'is_mock': True}
+        ]
+        
+        for packet in packets:
+            batcher.enqueue('market_data_batch', packet)
+        batcher.flush()
+        
+        frame = socketio.emit.call_args.args[1]
+        self.assertIsInstance(frame, bytes)
+        self.assertEqual(json.loads(zlib.decompress(frame)), packets)
+    
+    def test_batcher_last_frame_replay(self):
+        """Test that the latest frame per event/room is kept for reconnecting clients"""
+        socketio = Mock()
+        batcher = BroadcastBatcher(socketio)
+        self.assertIsNone(batcher.last_frame('market_data_batch', 'market_data'))
+        
+        batcher.enqueue('market_data_batch', {'seq': 1}, room='market_data')
+        batcher.flush()
+        batcher.enqueue('market_data_batch', {'seq': 2}, room='market_data')
+        batcher.flush()
+        
+        # Replay is the exact bytes last emitted to that room
+        self.assertEqual(batcher.last_frame('market_data_batch', 'market_data'),
+                         socketio.emit.call_args.args[1])
+        self.assertEqual(json.loads(zlib.decompress(batcher.last_frame('market_data_batch', 'market_data'))),
+                         [{'seq': 2}])
+        self.assertIsNone(batcher.last_frame('market_data_batch', 'other_room'))
+
+    def test_batcher_clear_and_drop_frames(self):
+        """Test that cached replay frames can be dropped per room or all at once"""
+        socketio = Mock()
+        batcher = BroadcastBatcher(socketio)
+        batcher.enqueue('market_data_batch', {'seq': 1}, room='market_data')
+        batcher.enqueue('market_data_batch', {'seq': 2}, room='other_room')
+        batcher.flush()
+        
+        batcher.drop_frames('market_data')
+        self.assertIsNone(batcher.last_frame('market_data_batch', 'market_data'))
+        self.assertIsNotNone(batcher.last_frame('market_data_batch', 'other_room'))
+        
+        batcher.enqueue('market_data_batch', {'seq': 3}, room='market_data')
+        batcher.clear()
+        batcher.flush()
+        self.assertEqual(socketio.emit.call_count, 2)  # The pending packet was discarded too
+        self.assertIsNone(batcher.last_frame('market_data_batch', 'other_room'))
+    
+    def test_web_role_watchlist_relay(self):
+        """Test that a web-role manager relays watchlist edits instead of streaming them"""
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = MarketDataManager(os.path.join(tmp, 'data'))
+            manager.watchlist_sync = Mock()
+            
+            self.assertTrue(manager.add_symbol('aapl'))
+            manager.watchlist_sync.publish.assert_called_once_with('add', 'AAPL')
+            self.assertEqual(manager.get_watchlist(), ['AAPL'])
+            self.assertEqual(manager.equity_stream_manager.get_subscriptions(), set())
+            
+            # Edits published by other workers only update the local mirror
+            manager.apply_watchlist_change('add', 'MSFT')
+            manager.apply_watchlist_change('remove', 'AAPL')
+            self.assertEqual(manager.get_watchlist(), ['MSFT'])
+            self.assertEqual(manager.watchlist_sync.publish.call_count, 1)
+            
+            # watchlist.json belongs to the streamer
+            self.assertFalse(os.path.exists(manager.watchlist_file))
+
 def run_integration_test():
     """Run an integration test with mock streaming"""
     print("Starting integration test...")
@@ -1,11 +1,13 @@
 // Enhanced market_data.js - Fixed to handle mock mode properly
 class MarketDataApp {
     constructor() {
-        this.socket = io();
+        // WebSocket only: gunicorn cannot pin long-polling clients to one worker
+        this.socket = io({transports: ['websocket']});
         this.marketData = {};
         this.watchlist = new Set();
         this.isMockMode = false;
         this.connectionStatusInitialized = false;
+        this.batchQueue = Promise.resolve();
         
         // Set initial connection status
         this.updateConnectionStatus(false);
@@ -39,20 +41,16 @@ class MarketDataApp {
         });
 
         this.socket.on('market_data', (data) => {
-            // Filter out non-equity data that might be sent accidentally
-            if (this.isValidSymbol(data.symbol)) {
-                this.updateMarketData(data.symbol, data.data);
-                
-                // Update mock mode status if provided
-                if (data.is_mock !== undefined) {
-                    this.isMockMode = data.is_mock;
-                    this.updateMockModeUI();
-                    // Update connection status with current mock mode
-                    this.updateConnectionStatus(this.socket.connected);
-                }
-            } else {
-                console.log('Filtered out invalid symbol:', data.symbol);
-            }
+            this.handleMarketData(data);
+        });
+
+        // Server coalesces ticks into one zlib-compressed JSON array per flush window
+        this.socket.on('market_data_batch', (frame) => {
+            // Chain decoding so batches are applied in arrival order
+            this.batchQueue = this.batchQueue
+                .then(() => this.inflateBatch(frame))
+                .then(packets => packets.forEach(data => this.handleMarketData(data)))
+                .catch(error => console.error('Failed to decode market data batch:', error));
         });
 
         this.socket.on('watchlist_updated', (data) => {
@@ -72,6 +70,28 @@ class MarketDataApp {
         });
     }
 
+    async inflateBatch(frame) {
+        const stream = new Blob([frame]).stream().pipeThrough(new DecompressionStream('deflate'));
+        return JSON.parse(await new Response(stream).text());
+    }
+
+    handleMarketData(data) {
+        // Filter out non-equity data that might be sent accidentally
+        if (this.isValidSymbol(data.symbol)) {
+            this.updateMarketData(data.symbol, data.data);
+            
+            // Update mock mode status if provided
+            if (data.is_mock !== undefined) {
+                this.isMockMode = data.is_mock;
+                this.updateMockModeUI();
+                // Update connection status with current mock mode
+                this.updateConnectionStatus(this.socket.connected);
+            }
+        } else {
+            console.log('Filtered out invalid symbol:', data.symbol);
+        }
+    }
+
     isValidSymbol(symbol) {
         // Check if this looks like a valid stock symbol
         if (!symbol || typeof symbol !== 'string') return false;
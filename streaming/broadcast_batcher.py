@@ -0,0 +1,97 @@
+# streaming/broadcast_batcher.py - Coalesce high-frequency Socket.IO broadcasts
+import logging
+import threading
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+class BroadcastBatcher:
+    """
+    Buffers outgoing Socket.IO packets per (event, room) and emits each
+    buffer as a single list once per flush window, so a burst of ticks
+    costs one write per client instead of one write per tick.
+
+    Packets (dicts or msgspec structs) are encoded to JSON bytes as soon as
+    they are queued, so a flush only joins ready-made fragments into an
+    array. Each batch is zlib-compressed once and sent as a binary frame, so compression cost
+    does not grow with the number of clients.
+    """
+
+    FLUSH_INTERVAL = 0.05   # Seconds between flushes
+    MAX_PENDING = 140       # Flush a buffer early once it reaches this size
+    COMPRESSION_LEVEL = 1   # Fastest zlib level; ticks are small and frequent
+
+    def __init__(self, socketio, flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING):
+        self.socketio = socketio
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[str, Optional[str]], List[bytes]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+        self._last_frames: Dict[Tuple[str, Optional[str]], bytes] = {}
+        self._encoder = msgspec.json.Encoder()
+
+    def enqueue(self, event: str, packet: Any, room: Optional[str] = None):
+        """Queue a packet for the next batched emit of event to room"""
+        key = (event, room)
+        fragment = self._encoder.encode(packet)
+        overflow = None
+
+        with self._lock:
+            buffer = self._pending[key]
+            buffer.append(fragment)
+            if len(buffer) >= self.max_pending:
+                overflow = self._pending.pop(key)
+
+            schedule_flush = bool(self._pending) and not self._flush_scheduled
+            if schedule_flush:
+                self._flush_scheduled = True
+
+        if overflow:
+            self._emit_batch(key, overflow)
+        if schedule_flush:
+            self.socketio.start_background_task(self._flush_after, self.flush_interval)
+
+    def flush(self):
+        """Emit every pending buffer immediately"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+            self._flush_scheduled = False
+
+        for key, fragments in pending.items():
+            self._emit_batch(key, fragments)
+
+    def clear(self):
+        """Drop pending packets and cached replay frames, e.g. when streaming stops"""
+        with self._lock:
+            self._pending.clear()
+            self._last_frames.clear()
+
+    def drop_frames(self, room: Optional[str] = None):
+        """Forget the cached replay frames for room once they no longer reflect its data"""
+        with self._lock:
+            for key in [key for key in self._last_frames if key[1] == room]:
+                del self._last_frames[key]
+
+    def last_frame(self, event: str, room: Optional[str] = None) -> Optional[bytes]:
+        """Most recent compressed frame for event/room, for replay to reconnecting clients"""
+        return self._last_frames.get((event, room))
+
+    def _flush_after(self, delay: float):
+        """Background task: wait out the coalescing window, then flush"""
+        self.socketio.sleep(delay)
+        self.flush()
+
+    def _emit_batch(self, key: Tuple[str, Optional[str]], fragments: List[bytes]):
+        """Send one accumulated buffer as a single pre-compressed binary message"""
+        event, room = key
+        try:
+            payload = b'[' + b','.join(fragments) + b']'
+            compressed = zlib.compress(payload, self.COMPRESSION_LEVEL)
+            self._last_frames[key] = compressed
+            self.socketio.emit(event, compressed, room=room)
+        except Exception as e:
+            logger.error("Error emitting %s batch (%d packets): %s", event, len(fragments), e)
@@ -2,9 +2,25 @@
 import logging
 import time
 from typing import Dict, Any, Optional, Callable, List
+import msgspec
 
 logger = logging.getLogger(__name__)
 
+class EquityTick(msgspec.Struct):
+    """Standardized level one equity quote (fixed slots, encodes straight to JSON bytes)"""
+    symbol: str
+    last_price: Optional[float]
+    bid_price: Optional[float]
+    ask_price: Optional[float]
+    volume: Optional[int]
+    high_price: Optional[float]
+    low_price: Optional[float]
+    net_change: Optional[float]
+    net_change_percent: Optional[float]
+    timestamp: int
+    data_source: str
+    asset_type: str = 'EQUITY'
+
 class EquityStreamProcessor:
     """
     Equity-specific streaming processor that handles:
@@ -80,7 +96,7 @@ class EquityStreamProcessor:
         import json
         return json.dumps(subscription)
     
-    def process_message(self, message_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def process_message(self, message_data: Dict[str, Any]) -> Optional[EquityTick]:
         """
         Process equity streaming message and extract standardized data
         
@@ -88,7 +104,7 @@ class EquityStreamProcessor:
             message_data: Raw message data from Schwab WebSocket
             
         Returns:
-            Standardized equity data dict or None if not processable
+            Standardized EquityTick or None if not processable
         """
         try:
             if not message_data.get("data"):
@@ -104,7 +120,7 @@ class EquityStreamProcessor:
             logger.error(f"Error processing equity message: {e}")
             return None
     
-    def _process_equity_data(self, data_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _process_equity_data(self, data_item: Dict[str, Any]) -> Optional[EquityTick]:
         """Process individual equity data item"""
         try:
             timestamp = data_item.get("timestamp", int(time.time() * 1000))
@@ -131,40 +147,39 @@ class EquityStreamProcessor:
             logger.error(f"Error processing equity data item: {e}")
             return None
     
-    def _extract_equity_fields(self, symbol: str, content: Dict[str, Any], timestamp: int) -> Dict[str, Any]:
+    def _extract_equity_fields(self, symbol: str, content: Dict[str, Any], timestamp: int) -> EquityTick:
         """Extract equity fields from Schwab content using field mappings"""
-        return {
-            'symbol': symbol,
-            'last_price': self._safe_float(content.get(self.EQUITY_FIELDS["last_price"])),
-            'bid_price': self._safe_float(content.get(self.EQUITY_FIELDS["bid_price"])),
-            'ask_price': self._safe_float(content.get(self.EQUITY_FIELDS["ask_price"])),
-            'volume': self._safe_int(content.get(self.EQUITY_FIELDS["volume"])),
-            'high_price': self._safe_float(content.get(self.EQUITY_FIELDS["high_price"])),
-            'low_price': self._safe_float(content.get(self.EQUITY_FIELDS["low_price"])),
-            'net_change': self._safe_float(content.get(self.EQUITY_FIELDS["net_change"])),
-            'net_change_percent': self._safe_float(content.get(self.EQUITY_FIELDS["net_change_percent"])),
-            'timestamp': timestamp,
-            'data_source': 'MOCK' if self.is_mock_mode else 'SCHWAB_API',
-            'asset_type': 'EQUITY'
-        }
+        return EquityTick(
+            symbol=symbol,
+            last_price=self._safe_float(content.get(self.EQUITY_FIELDS["last_price"])),
+            bid_price=self._safe_float(content.get(self.EQUITY_FIELDS["bid_price"])),
+            ask_price=self._safe_float(content.get(self.EQUITY_FIELDS["ask_price"])),
+            volume=self._safe_int(content.get(self.EQUITY_FIELDS["volume"])),
+            high_price=self._safe_float(content.get(self.EQUITY_FIELDS["high_price"])),
+            low_price=self._safe_float(content.get(self.EQUITY_FIELDS["low_price"])),
+            net_change=self._safe_float(content.get(self.EQUITY_FIELDS["net_change"])),
+            net_change_percent=self._safe_float(content.get(self.EQUITY_FIELDS["net_change_percent"])),
+            timestamp=timestamp,
+            data_source='MOCK' if self.is_mock_mode else 'SCHWAB_API'
+        )
     
-    def _validate_equity_data(self, equity_data: Dict[str, Any]) -> bool:
+    def _validate_equity_data(self, equity_data: EquityTick) -> bool:
         """Validate equity data for basic sanity checks"""
         try:
             # Check for required fields
-            if not equity_data.get('symbol'):
+            if not equity_data.symbol:
                 return False
                 
             # Basic price validation
-            last_price = equity_data.get('last_price')
+            last_price = equity_data.last_price
             if last_price is not None and last_price <= 0:
-                logger.warning(f"Invalid last price for {equity_data['symbol']}: {last_price}")
+                logger.warning(f"Invalid last price for {equity_data.symbol}: {last_price}")
                 return False
                 
             # Volume validation
-            volume = equity_data.get('volume')
+            volume = equity_data.volume
             if volume is not None and volume < 0:
-                logger.warning(f"Invalid volume for {equity_data['symbol']}: {volume}")
+                logger.warning(f"Invalid volume for {equity_data.symbol}: {volume}")
                 return False
                 
             return True
@@ -3,7 +3,7 @@ import logging
 import time
 from typing import Optional, Callable, Dict, Any, List
 from .stream_manager import StreamManager
-from .equity_stream import EquityStreamProcessor
+from .equity_stream import EquityStreamProcessor, EquityTick
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +16,7 @@ class EquityStreamManager(StreamManager):
     def __init__(self):
         super().__init__()
         self.equity_processor = EquityStreamProcessor()
-        self.equity_data_handler: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.equity_data_handler: Optional[Callable[[EquityTick], None]] = None
         
         # Override the message handler to use equity processing
         super().set_message_handler(self._process_equity_message)
@@ -26,7 +26,7 @@ class EquityStreamManager(StreamManager):
         super().set_dependencies(streamer, socketio)
         self.equity_processor.set_mock_mode(is_mock_mode)
         
-    def set_equity_data_handler(self, handler: Callable[[Dict[str, Any]], None]):
+    def set_equity_data_handler(self, handler: Callable[[EquityTick], None]):
         """Set handler for processed equity data"""
         self.equity_data_handler = handler
         
@@ -63,6 +63,7 @@ class EquityStreamManager(StreamManager):
         success = self.remove_subscription(symbol)
         
         if success:
+            self._unsubscribe_from_equity(symbol)
             logger.info(f"Removed equity subscription for {symbol}")
             
         return success
@@ -102,4 +103,13 @@ class EquityStreamManager(StreamManager):
                 logger.info(f"Sent equity subscription for {symbol}")
                 
         except Exception as e:
-            logger.error(f"Error subscribing to equity {symbol}: {e}")
\ No newline at end of file
+            logger.error(f"Error subscribing to equity {symbol}: {e}")
+
+    def _unsubscribe_from_equity(self, symbol: str):
+        """Stop the mock streamer generating quotes for symbol"""
+        try:
+            if hasattr(self.streamer, 'remove_symbol'):
+                self.streamer.remove_symbol(symbol)
+                logger.info(f"Removed {symbol} from mock equity stream")
+        except Exception as e:
+            logger.error(f"Error unsubscribing from equity {symbol}: {e}")
\ No newline at end of file
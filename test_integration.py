@@ -223,6 +223,7 @@ if __name__ == "__main__":
         print("1. Running unit tests...")
         try:
             suite = unittest.TestLoader().loadTestsFromTestCase(MarketDataStreamingTests)
+            suite.addTests(unittest.TestLoader().loadTestsFromTestCase(FlaskAppTests))
             runner = unittest.TextTestRunner(verbosity=1)
             result = runner.run(suite)
             
@@ -284,6 +285,105 @@ if __name__ == "__main__":
         
         return success
 
+class FlaskAppTests(unittest.TestCase):
+    """Test the Flask app's request handling with the mock login"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Import the app once for all tests"""
+        import app as app_module
+        cls.app_module = app_module
+    
+    def setUp(self):
+        """Fresh client, with market data off so logins don't start streaming"""
+        self.client = self.app_module.app.test_client()
+        patcher = patch.object(self.app_module.Config, 'ENABLE_MARKET_DATA', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.app_module._PAGE_CACHE.clear()
+    
+    def test_page_cache_cleared_on_login(self):
+        """Test that authenticating drops previously rendered pages"""
+        self.app_module._PAGE_CACHE[('stale',)] = '<html>stale</html>'
+        
+        response = self.client.get('/authenticate?mock=true')
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(('stale',), self.app_module._PAGE_CACHE)
+    
+    def test_page_cache_cleared_on_logout(self):
+        """Test that logging out drops the cached dashboard"""
+        self.client.get('/authenticate?mock=true')
+        self.client.get('/')  # Consumes the login flash
+        self.assertEqual(self.client.get('/').status_code, 200)
+        self.assertTrue(self.app_module._PAGE_CACHE)
+        
+        response = self.client.get('/logout')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.app_module._PAGE_CACHE, {})
+
+    def test_flash_through_orjson_provider(self):
+        """Test that flashed messages survive the orjson JSON provider"""
+        from flask.sessions import SecureCookieSessionInterface
+        app = self.app_module.app
+        self.assertIsInstance(app.json, self.app_module.ORJSONProvider)
+        
+        # Cookie sessions decode through app.json with an object_hook; flashes are tagged tuples
+        serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+        with app.test_request_context():
+            token = serializer.dumps({'_flashes': [('warning', 'Mock mode')]})
+            self.assertEqual(serializer.loads(token)['_flashes'], [('warning', 'Mock mode')])
+        
+        # The mock login flashes a banner that the dashboard renders
+        self.client.get('/authenticate?mock=true')
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Using MOCK data mode', response.get_data(as_text=True))
+
+    def test_orjson_provider_sort_keys(self):
+        """Test that the orjson provider honors sort_keys like Flask's default provider"""
+        app = self.app_module.app
+        provider = app.json
+        with app.app_context():
+            self.assertEqual(provider.dumps({'b': 1, 'a': 2}), '{"a":2,"b":1}')
+            body = provider.response({'b': 1, 'a': 2}).get_data(as_text=True)
+            self.assertLess(body.index('"a"'), body.index('"b"'))
+            provider.sort_keys = False
+            try:
+                self.assertEqual(provider.dumps({'b': 1, 'a': 2}), '{"b":1,"a":2}')
+            finally:
+                provider.sort_keys = True
+
+    def test_unchanged_session_not_rewritten(self):
+        """Test that requests which don't change the session skip the Redis write"""
+        store = {}
+        session_redis = MagicMock()
+        session_redis.get.side_effect = store.get
+        session_redis.setex.side_effect = lambda name, value, time: store.__setitem__(name, value)
+        interface = self.app_module.RefreshAwareRedisSessionInterface(session_redis, 'session:', True)
+        
+        with patch.object(self.app_module.app, 'session_interface', interface):
+            self.client.get('/authenticate?mock=true')
+            self.client.get('/')  # Consumes the login flash, which changes the session
+            writes = session_redis.setex.call_count
+            
+            response = self.client.get('/')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Set-Cookie', response.headers)
+            self.client.get('/static/css/main.css')
+            self.assertEqual(session_redis.setex.call_count, writes)
+
+    def test_web_role_login_skips_schwab_client(self):
+        """Test that web workers report the streamer's data mode without connecting to Schwab"""
+        config = self.app_module.Config
+        with patch.object(config, 'ROLE', 'web'), patch.object(config, 'USE_MOCK_DATA', False), \
+             patch.object(self.app_module, 'get_schwab_client') as get_client:
+            self.client.get('/authenticate?mock=true')
+            status = self.client.get('/api/auth-status').get_json()
+        
+        get_client.assert_not_called()
+        self.assertFalse(status['mock_mode'])
+        self.assertEqual(status['data_source'], 'SCHWAB_API')
+
 def main():
     """Main test runner"""
     import argparse